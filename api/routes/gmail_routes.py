@@ -3,9 +3,10 @@ Gmail API Routes
 Endpoints for Gmail integration
 """
 
+from dataclasses import dataclass
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse
 
 from api.services.gmail_service import get_gmail_service
 from utils.logger import logger
@@ -14,24 +15,30 @@ from utils.logger import logger
 router = APIRouter()
 
 
-class EmailResponse(BaseModel):
-    """Email response model"""
+@dataclass(slots=True)
+class EmailResponse:
+    """Email payload shape returned by the email routes
+
+    Documents the dicts built in GmailService._parse_message, which are
+    returned as-is (the 'from_email' field is keyed 'from' on the wire).
+    Kept out of the response path: validating every email through a
+    model allocates a dict plus validators per message for fields that
+    are plain strings.
+    """
     id: str
     thread_id: str
-    from_email: str = Field(alias="from")
+    from_email: str
     to: str
     subject: str
     date: str
     snippet: str
     body: str
     internal_date: str
-    
-    class Config:
-        populate_by_name = True
 
 
-class EmailListResponse(BaseModel):
-    """Email list response"""
+@dataclass(slots=True)
+class EmailListResponse:
+    """Email list payload shape"""
     count: int
     emails: List[EmailResponse]
 
@@ -42,9 +49,10 @@ async def connect_gmail():
     Test Gmail API connection
     """
     try:
+        # The service connects at construction; only reconnect if that failed
         service = get_gmail_service()
-        success = service.connect()
-        
+        success = service.service is not None or service.connect()
+
         if success:
             return {
                 "status": "success",
@@ -61,7 +69,7 @@ async def connect_gmail():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/unread", response_model=EmailListResponse)
+@router.get("/unread")
 async def get_unread_emails(
     sender: str = Query(
         default="alerts@hdfcbank.net",
@@ -72,36 +80,45 @@ async def get_unread_emails(
         ge=1,
         le=50,
         description="Maximum number of emails to fetch"
+    ),
+    include_body: bool = Query(
+        default=False,
+        description="Fetch full message bodies (snippet-only by default)"
     )
 ):
     """
     Fetch unread emails from specific sender
-    
+
     Args:
         sender: Email address to filter by
         max_results: Maximum number of emails to fetch (1-50)
-    
+        include_body: Whether to fetch full message bodies
+
     Returns:
         List of unread emails
     """
     try:
         service = get_gmail_service()
-        emails = service.get_unread_emails(
+        emails = await service.get_unread_emails(
             sender_email=sender,
-            max_results=max_results
+            max_results=max_results,
+            include_body=include_body
         )
         
-        return {
+        # The dicts already match the response shape; serialize directly
+        # with orjson instead of rebuilding them through the default
+        # jsonable_encoder pass.
+        return ORJSONResponse({
             "count": len(emails),
             "emails": emails
-        }
+        })
     
     except Exception as e:
         logger.error(f"Error fetching unread emails: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/all", response_model=EmailListResponse)
+@router.get("/all")
 async def get_all_emails(
     sender: str = Query(
         default="alerts@hdfcbank.net",
@@ -116,31 +133,40 @@ async def get_all_emails(
     include_read: bool = Query(
         default=True,
         description="Include read emails"
+    ),
+    include_body: bool = Query(
+        default=False,
+        description="Fetch full message bodies (snippet-only by default)"
     )
 ):
     """
     Fetch all emails (for historical data import)
-    
+
     Args:
         sender: Email address to filter by
         max_results: Maximum number of emails to fetch (1-100)
         include_read: Whether to include read emails
-    
+        include_body: Whether to fetch full message bodies
+
     Returns:
         List of all emails
     """
     try:
         service = get_gmail_service()
-        emails = service.get_all_emails(
+        emails = await service.get_all_emails(
             sender_email=sender,
             max_results=max_results,
-            include_read=include_read
+            include_read=include_read,
+            include_body=include_body
         )
         
-        return {
+        # The dicts already match the response shape; serialize directly
+        # with orjson instead of rebuilding them through the default
+        # jsonable_encoder pass.
+        return ORJSONResponse({
             "count": len(emails),
             "emails": emails
-        }
+        })
     
     except Exception as e:
         logger.error(f"Error fetching all emails: {e}")
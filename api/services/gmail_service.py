@@ -3,44 +3,136 @@ Gmail Service - Handles Gmail API authentication and email fetching
 """
 
 import os
+import asyncio
 import base64
+import json
 import pickle
+import threading
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+try:
+    import keyring
+except ImportError:  # fall back to the token file
+    keyring = None
+
 from utils.logger import logger
 from utils.env_loader import get_env_loader
+from utils.jsonfast import patch_googleapiclient
+from utils.ratelimit import execute_with_retry, get_gmail_limiter
+
+# Parse Gmail's JSON payloads with orjson when available
+patch_googleapiclient()
 
 
 class GmailService:
     """Gmail API service for fetching transaction emails"""
     
     SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
-    TOKEN_FILE = 'token.pickle'
-    
+    TOKEN_FILE = 'token.json'
+    LEGACY_TOKEN_FILE = 'token.pickle'  # pre-JSON store, migrated on first load
+    KEYRING_SERVICE = 'budgetops'
+    KEYRING_USERNAME = 'gmail_token'
+    BATCH_SIZE = 50  # Inner requests per batch call (Gmail caps at 100)
+    MAX_CONCURRENT_FETCHES = 30  # Stay under Gmail's concurrent get quota
+    QUOTA_UNITS_PER_CALL = 5  # messages.get/list/modify each cost 5 units
+    METADATA_HEADERS = ['From', 'To', 'Subject', 'Date']  # All we ever read
+
+    # Partial-response masks: drop labelIds/sizeEstimate/historyId and the
+    # MIME metadata we never look at before it hits the wire
+    LIST_FIELDS = 'messages/id,nextPageToken'
+    METADATA_FIELDS = 'id,threadId,internalDate,snippet,payload/headers'
+    FULL_FIELDS = ('id,threadId,internalDate,snippet,'
+                   'payload(headers,body,parts(mimeType,body))')
+
     def __init__(self):
         """Initialize Gmail service"""
         self.config = get_env_loader().get_config()
         self.creds: Optional[Credentials] = None
         self.service = None
+        self._fetch_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_FETCHES)
+        self._local = threading.local()
         self._load_credentials()
+        self.connect()
     
+    def _read_token(self) -> Optional[str]:
+        """
+        Read the stored token JSON
+
+        Tries the OS keyring first (no disk IO on warm processes), then
+        token.json, then a legacy token.pickle which is migrated once.
+
+        Returns:
+            Token JSON string or None
+        """
+        if keyring is not None:
+            try:
+                token_json = keyring.get_password(
+                    self.KEYRING_SERVICE, self.KEYRING_USERNAME
+                )
+                if token_json:
+                    return token_json
+            except Exception as e:
+                logger.debug(f"Keyring unavailable, using token file: {e}")
+
+        token_path = Path(self.TOKEN_FILE)
+        if token_path.exists():
+            return token_path.read_text()
+
+        legacy_path = Path(self.LEGACY_TOKEN_FILE)
+        if legacy_path.exists():
+            # One-time migration from the old pickle store
+            logger.info("Migrating legacy pickle token...")
+            with open(legacy_path, 'rb') as token:
+                creds = pickle.load(token)
+
+            # Persist before unlinking the only stored copy; if the
+            # credentials are still valid, _load_credentials never calls
+            # _store_token and the token would otherwise be lost
+            token_json = creds.to_json()
+            Path(self.TOKEN_FILE).write_text(token_json)
+            legacy_path.unlink()
+            return token_json
+
+        return None
+
+    def _store_token(self) -> None:
+        """Persist credentials to the keyring, or token.json as fallback"""
+        token_json = self.creds.to_json()
+
+        if keyring is not None:
+            try:
+                keyring.set_password(
+                    self.KEYRING_SERVICE, self.KEYRING_USERNAME, token_json
+                )
+                logger.success("Credentials saved to keyring")
+                return
+            except Exception as e:
+                logger.debug(f"Keyring unavailable, using token file: {e}")
+
+        Path(self.TOKEN_FILE).write_text(token_json)
+        logger.success("Credentials saved")
+
     def _load_credentials(self) -> None:
         """Load or refresh credentials"""
-        token_path = Path(self.TOKEN_FILE)
-        
         # Load existing token
-        if token_path.exists():
-            with open(self.TOKEN_FILE, 'rb') as token:
-                self.creds = pickle.load(token)
-        
+        token_json = self._read_token()
+        if token_json:
+            self.creds = Credentials.from_authorized_user_info(
+                json.loads(token_json),
+                self.SCOPES
+            )
+
         # Refresh or get new credentials
         if not self.creds or not self.creds.valid:
             if self.creds and self.creds.expired and self.creds.refresh_token:
@@ -49,11 +141,9 @@ class GmailService:
             else:
                 logger.info("Initiating OAuth flow for new credentials...")
                 self._get_new_credentials()
-            
+
             # Save credentials
-            with open(self.TOKEN_FILE, 'wb') as token:
-                pickle.dump(self.creds, token)
-            logger.success("Credentials saved")
+            self._store_token()
     
     def _get_new_credentials(self) -> None:
         """Get new credentials via OAuth flow"""
@@ -77,6 +167,42 @@ class GmailService:
         self.creds = flow.run_local_server(port=8000)
         logger.success("New credentials obtained via OAuth")
     
+    def _authorized_http(self) -> AuthorizedHttp:
+        """
+        Get the per-thread authorized HTTP transport
+
+        httplib2 keeps connections alive per instance but is not
+        thread-safe, so each executor thread gets its own transport and
+        reuses its pooled TLS connection instead of re-handshaking.
+
+        Returns:
+            AuthorizedHttp bound to this thread
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.creds, http=httplib2.Http())
+            self._local.http = http
+        return http
+
+    def _execute(self, request, cost: float = QUOTA_UNITS_PER_CALL):
+        """
+        Execute an API request through the shared rate limiter
+
+        Args:
+            request: Prepared API request (single or batch)
+            cost: Quota units the request consumes; batch executes pass
+                the sum of their inner-request costs
+
+        Returns:
+            The request's response
+        """
+        return execute_with_retry(
+            request,
+            get_gmail_limiter(),
+            http=self._authorized_http(),
+            cost=cost
+        )
+
     def connect(self) -> bool:
         """
         Connect to Gmail API
@@ -85,110 +211,325 @@ class GmailService:
             True if connection successful
         """
         try:
-            self.service = build('gmail', 'v1', credentials=self.creds)
+            self.service = build(
+                'gmail', 'v1',
+                credentials=self.creds,
+                cache_discovery=False
+            )
             logger.success("Successfully connected to Gmail API")
             return True
         except HttpError as error:
             logger.error(f"Failed to connect to Gmail API: {error}")
             return False
     
-    def get_unread_emails(
+    async def get_unread_emails(
         self,
         sender_email: str = "alerts@hdfcbank.net",
-        max_results: int = 10
+        max_results: int = 10,
+        skip_existing: bool = True,
+        include_body: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Fetch unread emails from specific sender
-        
+
         Args:
             sender_email: Email address to filter by
             max_results: Maximum number of emails to fetch
-            
+            skip_existing: Skip emails already ingested as transactions
+            include_body: Fetch full bodies (snippet-only by default)
+
         Returns:
             List of email data dictionaries
         """
-        if not self.service:
-            logger.warning("Service not connected. Connecting now...")
-            if not self.connect():
-                return []
-        
         try:
             # Build query
             query = f"from:{sender_email} is:unread"
             logger.info(f"Fetching unread emails: {query}")
-            
+
             # Get message list
-            results = self.service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=max_results
-            ).execute()
-            
-            messages = results.get('messages', [])
-            
+            messages = await self._list_messages(query, max_results)
+
             if not messages:
                 logger.info("No unread emails found")
                 return []
-            
+
             logger.info(f"Found {len(messages)} unread email(s)")
-            
-            # Fetch full message details
-            email_data = []
-            for msg in messages:
-                email = self._get_message_details(msg['id'])
-                if email:
-                    email_data.append(email)
-            
-            return email_data
-            
+
+            # Skip messages already ingested before paying for their bodies
+            if skip_existing:
+                messages = await self._filter_ingested(messages)
+                if not messages:
+                    logger.info("All unread emails already ingested")
+                    return []
+
+            # Fetch message details in batched HTTP calls
+            return await self._fetch_message_details(
+                [msg['id'] for msg in messages],
+                include_body=include_body
+            )
+
         except HttpError as error:
             logger.error(f"Error fetching emails: {error}")
             return []
-    
-    def _get_message_details(self, msg_id: str) -> Optional[Dict[str, Any]]:
+
+    async def _list_messages(
+        self,
+        query: str,
+        max_results: int
+    ) -> List[Dict[str, Any]]:
+        """
+        List message stubs for a query, following nextPageToken
+
+        A single list() call silently truncates at Gmail's page cap
+        (500); paging makes large historical imports actually return
+        max_results messages instead of the first page.
+
+        Args:
+            query: Gmail search query
+            max_results: Maximum number of messages to collect
+
+        Returns:
+            List of message stubs ({'id': ...})
+        """
+        loop = asyncio.get_running_loop()
+        messages: List[Dict[str, Any]] = []
+        page_token: Optional[str] = None
+
+        while len(messages) < max_results:
+            request = self.service.users().messages().list(
+                userId='me',
+                q=query,
+                maxResults=min(500, max_results - len(messages)),
+                pageToken=page_token,
+                fields=self.LIST_FIELDS
+            )
+            response = await loop.run_in_executor(None, self._execute, request)
+
+            messages.extend(response.get('messages', []))
+
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+        return messages[:max_results]
+
+    async def _filter_ingested(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Drop messages whose ID already has a transaction in Supabase
+
+        One batched existence check replaces N useless message fetches
+        for emails that were already parsed on a previous run.
+
+        Args:
+            messages: Message stubs from messages().list()
+
+        Returns:
+            Messages not yet ingested
+        """
+        from db.client import get_supabase_client
+
+        existing = await get_supabase_client().get_existing_email_ids(
+            [msg['id'] for msg in messages]
+        )
+
+        if existing:
+            logger.info(f"Skipping {len(existing)} already-ingested email(s)")
+            messages = [msg for msg in messages if msg['id'] not in existing]
+
+        return messages
+
+    async def _fetch_message_details(
+        self,
+        msg_ids: List[str],
+        include_body: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch message details for multiple IDs using Gmail batch requests
+
+        One batch HTTP call covers up to BATCH_SIZE messages instead of
+        one round trip per message; batches run concurrently on the
+        default executor, bounded by a shared semaphore.
+
+        Args:
+            msg_ids: List of message IDs
+            include_body: Fetch the full MIME payload (otherwise headers
+                and snippet only, a fraction of the bytes on the wire)
+
+        Returns:
+            List of email data dictionaries (in msg_ids order)
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        loop = asyncio.get_running_loop()
+
+        async def fetch_chunk(chunk: List[str]) -> None:
+            async with self._fetch_semaphore:
+                await loop.run_in_executor(
+                    None, self._execute_batch, chunk, results, include_body
+                )
+
+        # Chunk IDs to stay under Gmail's inner-request cap
+        chunks = [
+            msg_ids[i:i + self.BATCH_SIZE]
+            for i in range(0, len(msg_ids), self.BATCH_SIZE)
+        ]
+        await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+
+        return [results[msg_id] for msg_id in msg_ids if msg_id in results]
+
+    def _message_request(self, msg_id: str, include_body: bool):
+        """
+        Build a messages().get() request
+
+        Defaults to format='metadata' with a header allowlist, which is
+        10-50x fewer bytes than format='full' when the body isn't needed.
+
+        Args:
+            msg_id: Message ID
+            include_body: Request the full MIME payload
+
+        Returns:
+            Prepared API request
+        """
+        if include_body:
+            return self.service.users().messages().get(
+                userId='me',
+                id=msg_id,
+                format='full',
+                fields=self.FULL_FIELDS
+            )
+
+        return self.service.users().messages().get(
+            userId='me',
+            id=msg_id,
+            format='metadata',
+            metadataHeaders=self.METADATA_HEADERS,
+            fields=self.METADATA_FIELDS
+        )
+
+    def _execute_batch(
+        self,
+        msg_ids: List[str],
+        results: Dict[str, Dict[str, Any]],
+        include_body: bool = False
+    ) -> None:
+        """
+        Execute one batch get for a chunk of message IDs
+
+        Args:
+            msg_ids: Message IDs for this batch (<= BATCH_SIZE)
+            results: Shared dict to store parsed emails keyed by message ID
+            include_body: Fetch the full MIME payload
+        """
+        def callback(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Error getting message {request_id}: {exception}")
+                return
+            email = self._parse_message(response)
+            if email:
+                results[request_id] = email
+
+        try:
+            batch = self.service.new_batch_http_request(callback=callback)
+            for msg_id in msg_ids:
+                batch.add(
+                    self._message_request(msg_id, include_body),
+                    request_id=msg_id
+                )
+            # A batch costs its inner gets, not one unit
+            self._execute(batch, cost=len(msg_ids) * self.QUOTA_UNITS_PER_CALL)
+
+        except HttpError as error:
+            logger.error(f"Error fetching message batch: {error}")
+
+    def _get_message_details(
+        self,
+        msg_id: str,
+        include_body: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """
         Get detailed message information
-        
+
         Args:
             msg_id: Message ID
-            
+            include_body: Fetch the full MIME payload
+
         Returns:
             Dictionary with message details
         """
         try:
-            message = self.service.users().messages().get(
-                userId='me',
-                id=msg_id,
-                format='full'
-            ).execute()
-            
-            # Extract headers
-            headers = message['payload']['headers']
-            header_dict = {h['name']: h['value'] for h in headers}
-            
+            message = self._execute(self._message_request(msg_id, include_body))
+
+            return self._parse_message(message)
+
+        except HttpError as error:
+            logger.error(f"Error getting message {msg_id}: {error}")
+            return None
+
+    def fetch_message_body(self, msg_id: str) -> str:
+        """
+        Fetch and decode the body of a single message
+
+        Only needed when the snippet isn't enough for downstream parsing;
+        the listing paths deliberately skip bodies.
+
+        Args:
+            msg_id: Message ID
+
+        Returns:
+            Decoded message body (empty string on failure)
+        """
+        try:
+            message = self._execute(self._message_request(msg_id, include_body=True))
+            return self._get_message_body(message.get('payload', {}))
+
+        except HttpError as error:
+            logger.error(f"Error getting body for message {msg_id}: {error}")
+            return ""
+
+    def _parse_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Parse a raw Gmail message into an email data dictionary
+
+        Args:
+            message: Raw message resource from the Gmail API
+
+        Returns:
+            Dictionary with message details
+        """
+        try:
+            # Extract only the headers we use, stopping once all are found
+            wanted = {'From', 'To', 'Subject', 'Date'}
+            found = {}
+            for h in message['payload']['headers']:
+                name = h['name']
+                if name in wanted:
+                    found[name] = h['value']
+                    if len(found) == len(wanted):
+                        break
+
             # Extract body
             body = self._get_message_body(message['payload'])
-            
+
             # Get snippet (preview text)
             snippet = message.get('snippet', '')
-            
+
             email_data = {
-                'id': msg_id,
+                'id': message['id'],
                 'thread_id': message.get('threadId'),
-                'from': header_dict.get('From', ''),
-                'to': header_dict.get('To', ''),
-                'subject': header_dict.get('Subject', ''),
-                'date': header_dict.get('Date', ''),
+                'from': found.get('From', ''),
+                'to': found.get('To', ''),
+                'subject': found.get('Subject', ''),
+                'date': found.get('Date', ''),
                 'snippet': snippet,
                 'body': body,
                 'internal_date': message.get('internalDate'),
             }
-            
+
             logger.debug(f"Fetched email: {email_data['subject']}")
             return email_data
-            
-        except HttpError as error:
-            logger.error(f"Error getting message {msg_id}: {error}")
+
+        except (KeyError, TypeError) as error:
+            logger.error(f"Error parsing message {message.get('id')}: {error}")
             return None
     
     def _get_message_body(self, payload: Dict) -> str:
@@ -201,23 +542,14 @@ class GmailService:
         Returns:
             Decoded message body
         """
-        body = ""
-        
-        if 'body' in payload and payload['body'].get('data'):
-            body = base64.urlsafe_b64decode(
-                payload['body']['data']
-            ).decode('utf-8')
-        
-        elif 'parts' in payload:
-            for part in payload['parts']:
-                if part['mimeType'] == 'text/plain':
-                    if 'data' in part['body']:
-                        body = base64.urlsafe_b64decode(
-                            part['body']['data']
-                        ).decode('utf-8')
-                        break
-        
-        return body
+        part = next(
+            (p for p in payload.get('parts', ())
+             if p.get('mimeType') == 'text/plain' and p.get('body', {}).get('data')),
+            None
+        )
+        data = payload.get('body', {}).get('data') or (part and part['body']['data'])
+
+        return base64.urlsafe_b64decode(data).decode('utf-8', 'replace') if data else ''
     
     def mark_as_read(self, msg_id: str) -> bool:
         """
@@ -230,11 +562,13 @@ class GmailService:
             True if successful
         """
         try:
-            self.service.users().messages().modify(
-                userId='me',
-                id=msg_id,
-                body={'removeLabelIds': ['UNREAD']}
-            ).execute()
+            self._execute(
+                self.service.users().messages().modify(
+                    userId='me',
+                    id=msg_id,
+                    body={'removeLabelIds': ['UNREAD']}
+                )
+            )
             
             logger.info(f"Marked email {msg_id} as read")
             return True
@@ -243,80 +577,63 @@ class GmailService:
             logger.error(f"Error marking email as read: {error}")
             return False
     
-    def get_all_emails(
+    async def get_all_emails(
         self,
         sender_email: str = "alerts@hdfcbank.net",
         max_results: int = 50,
-        include_read: bool = True
+        include_read: bool = True,
+        include_body: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Fetch all emails (read and unread) from specific sender
         For onboarding new users who want historical data
-        
+
         Args:
             sender_email: Email address to filter by
             max_results: Maximum number of emails to fetch
             include_read: Whether to include read emails
-            
+            include_body: Fetch full bodies (snippet-only by default)
+
         Returns:
             List of email data dictionaries
         """
-        if not self.service:
-            if not self.connect():
-                return []
-        
         try:
             # Build query
             query = f"from:{sender_email}"
             if not include_read:
                 query += " is:unread"
-            
+
             logger.info(f"Fetching emails: {query}")
-            
-            results = self.service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=max_results
-            ).execute()
-            
-            messages = results.get('messages', [])
-            
+
+            messages = await self._list_messages(query, max_results)
+
             if not messages:
                 logger.info("No emails found")
                 return []
-            
+
             logger.info(f"Found {len(messages)} email(s)")
-            
-            email_data = []
-            for msg in messages:
-                email = self._get_message_details(msg['id'])
-                if email:
-                    email_data.append(email)
-            
-            return email_data
-            
+
+            return await self._fetch_message_details(
+                [msg['id'] for msg in messages],
+                include_body=include_body
+            )
+
         except HttpError as error:
             logger.error(f"Error fetching emails: {error}")
             return []
 
 
-# Singleton instance
-_gmail_service: Optional[GmailService] = None
-
-
+@lru_cache(maxsize=1)
 def get_gmail_service() -> GmailService:
     """Get singleton instance of GmailService"""
-    global _gmail_service
-    if _gmail_service is None:
-        _gmail_service = GmailService()
-    return _gmail_service
+    return GmailService()
 
 
 if __name__ == "__main__":
     # Quick test
     service = get_gmail_service()
     service.connect()
-    emails = service.get_unread_emails(max_results=5)
+    emails = asyncio.run(service.get_unread_emails(max_results=5))
     print(f"Found {len(emails)} unread emails")
     for email in emails:
         print(f"- {email['subject']}")
\ No newline at end of file
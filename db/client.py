@@ -3,9 +3,13 @@ Supabase Client
 Wrapper for Supabase database operations
 """
 
+from functools import lru_cache
 from typing import Dict, List, Optional, Any
 from datetime import datetime, date
-from supabase import create_client, Client
+import asyncio
+
+from supabase import acreate_client
+from supabase import AClient
 from utils.env_loader import get_env_loader
 from utils.logger import logger
 
@@ -14,16 +18,31 @@ class SupabaseClient:
     """Wrapper for Supabase database operations"""
     
     def __init__(self):
-        """Initialize Supabase client"""
+        """Initialize Supabase client configuration"""
         config = get_env_loader().get_config()
-        
+
         self.url = config["supabase_url"]
         self.key = config["supabase_key"]
-        
-        self.client: Client = create_client(self.url, self.key)
-        logger.info("Supabase client initialized")
-    
-    def test_connection(self) -> bool:
+
+        self.client: Optional[AClient] = None
+        logger.info("Supabase client configured")
+
+    async def _get_client(self) -> AClient:
+        """
+        Get the async client, creating it on first use
+
+        The async client keeps queries off the event loop's back, so
+        FastAPI handlers no longer block on each HTTPS call.
+
+        Returns:
+            Connected AsyncClient instance
+        """
+        if self.client is None:
+            self.client = await acreate_client(self.url, self.key)
+            logger.info("Supabase async client initialized")
+        return self.client
+
+    async def test_connection(self) -> bool:
         """
         Test database connection
         
@@ -32,7 +51,8 @@ class SupabaseClient:
         """
         try:
             # Try a simple query
-            result = self.client.table('users').select('id').limit(1).execute()
+            client = await self._get_client()
+            result = await client.table('users').select('id').limit(1).execute()
             logger.success("✓ Supabase connection successful")
             return True
         except Exception as e:
@@ -41,70 +61,95 @@ class SupabaseClient:
     
     # ============= TRANSACTIONS =============
     
-    def insert_transaction(self, transaction_data: Dict[str, Any]) -> Optional[Dict]:
+    @staticmethod
+    def _prepare_row(transaction_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Map parsed transaction data to a transactions table row
+
+        Args:
+            transaction_data: Transaction data dictionary
+
+        Returns:
+            Row dictionary with None values stripped
+        """
+        data = {
+            'amount': transaction_data.get('amount'),
+            'transaction_type': transaction_data.get('transaction_type'),
+            'card': transaction_data.get('card'),
+            'to_merchant': transaction_data.get('to'),
+            'transaction_reference_number': transaction_data.get('transaction_reference_number'),
+            'description': transaction_data.get('description'),
+            'transaction_date': transaction_data.get('date'),
+            'transaction_timestamp': transaction_data.get('timestamp'),
+            'email_id': transaction_data.get('email_id'),
+            'email_subject': transaction_data.get('email_subject'),
+            'email_date': transaction_data.get('email_date'),
+        }
+
+        # Remove None values
+        return {k: v for k, v in data.items() if v is not None}
+
+    async def insert_transaction(self, transaction_data: Dict[str, Any]) -> Optional[Dict]:
         """
         Insert a transaction record
-        
+
         Args:
             transaction_data: Transaction data dictionary
-            
+
         Returns:
             Inserted record or None if failed
         """
         try:
-            # Prepare data
-            data = {
-                'amount': transaction_data.get('amount'),
-                'transaction_type': transaction_data.get('transaction_type'),
-                'card': transaction_data.get('card'),
-                'to_merchant': transaction_data.get('to'),
-                'transaction_reference_number': transaction_data.get('transaction_reference_number'),
-                'description': transaction_data.get('description'),
-                'transaction_date': transaction_data.get('date'),
-                'transaction_timestamp': transaction_data.get('timestamp'),
-                'email_id': transaction_data.get('email_id'),
-                'email_subject': transaction_data.get('email_subject'),
-                'email_date': transaction_data.get('email_date'),
-            }
-            
-            # Remove None values
-            data = {k: v for k, v in data.items() if v is not None}
-            
+            data = self._prepare_row(transaction_data)
+
             # Insert
-            result = self.client.table('transactions').insert(data).execute()
-            
+            client = await self._get_client()
+            result = await client.table('transactions').insert(data).execute()
+
             if result.data:
                 logger.success(f"✓ Inserted transaction: {data.get('amount')} {data.get('transaction_type')}")
                 return result.data[0]
             else:
                 logger.error("Failed to insert transaction")
                 return None
-                
+
         except Exception as e:
             logger.error(f"Error inserting transaction: {e}")
             return None
-    
-    def insert_transactions_batch(self, transactions: List[Dict[str, Any]]) -> List[Dict]:
+
+    async def insert_transactions_batch(self, transactions: List[Dict[str, Any]]) -> List[Dict]:
         """
-        Insert multiple transactions
-        
+        Insert multiple transactions in a single PostgREST call
+
+        Upserts on email_id so re-processing the same emails stays
+        idempotent instead of failing the unique constraint.
+
         Args:
             transactions: List of transaction data dictionaries
-            
+
         Returns:
             List of inserted records
         """
-        inserted = []
-        
-        for transaction in transactions:
-            result = self.insert_transaction(transaction)
-            if result:
-                inserted.append(result)
-        
-        logger.info(f"✓ Inserted {len(inserted)}/{len(transactions)} transactions")
-        return inserted
+        if not transactions:
+            return []
+
+        try:
+            rows = [self._prepare_row(t) for t in transactions]
+
+            client = await self._get_client()
+            result = await client.table('transactions')\
+                .upsert(rows, on_conflict='email_id')\
+                .execute()
+
+            inserted = result.data or []
+            logger.info(f"✓ Inserted {len(inserted)}/{len(transactions)} transactions")
+            return inserted
+
+        except Exception as e:
+            logger.error(f"Error inserting transaction batch: {e}")
+            return []
     
-    def get_transactions(
+    async def get_transactions(
         self,
         user_id: Optional[str] = None,
         start_date: Optional[str] = None,
@@ -126,24 +171,17 @@ class SupabaseClient:
             List of transaction records
         """
         try:
-            query = self.client.table('transactions').select('*')
-            
-            if user_id:
-                query = query.eq('user_id', user_id)
-            
-            if start_date:
-                query = query.gte('transaction_date', start_date)
-            
-            if end_date:
-                query = query.lte('transaction_date', end_date)
-            
-            if transaction_type:
-                query = query.eq('transaction_type', transaction_type)
-            
-            query = query.order('transaction_date', desc=True).limit(limit)
-            
-            result = query.execute()
-            
+            # One planned-once SQL function instead of rebuilding the
+            # filter chain per call (see transactions_filtered in schema.sql)
+            client = await self._get_client()
+            result = await client.rpc('transactions_filtered', {
+                'p_user_id': user_id,
+                'p_start_date': start_date,
+                'p_end_date': end_date,
+                'p_type': transaction_type,
+                'p_limit': limit,
+            }).execute()
+
             logger.info(f"✓ Retrieved {len(result.data)} transactions")
             return result.data
             
@@ -151,7 +189,7 @@ class SupabaseClient:
             logger.error(f"Error getting transactions: {e}")
             return []
     
-    def get_transaction_by_email_id(self, email_id: str) -> Optional[Dict]:
+    async def get_transaction_by_email_id(self, email_id: str) -> Optional[Dict]:
         """
         Get transaction by email ID (to avoid duplicates)
         
@@ -162,7 +200,8 @@ class SupabaseClient:
             Transaction record or None
         """
         try:
-            result = self.client.table('transactions')\
+            client = await self._get_client()
+            result = await client.table('transactions')\
                 .select('*')\
                 .eq('email_id', email_id)\
                 .execute()
@@ -175,7 +214,36 @@ class SupabaseClient:
             logger.error(f"Error getting transaction by email_id: {e}")
             return None
     
-    def update_transaction(self, transaction_id: str, updates: Dict[str, Any]) -> bool:
+    async def get_existing_email_ids(self, email_ids: List[str]) -> set:
+        """
+        Get the subset of email IDs that already have a transaction
+
+        One PostgREST call instead of per-ID lookups via
+        get_transaction_by_email_id.
+
+        Args:
+            email_ids: Gmail message IDs to check
+
+        Returns:
+            Set of email IDs already ingested
+        """
+        if not email_ids:
+            return set()
+
+        try:
+            client = await self._get_client()
+            result = await client.table('transactions')\
+                .select('email_id')\
+                .in_('email_id', email_ids)\
+                .execute()
+
+            return {row['email_id'] for row in result.data}
+
+        except Exception as e:
+            logger.error(f"Error checking existing email_ids: {e}")
+            return set()
+
+    async def update_transaction(self, transaction_id: str, updates: Dict[str, Any]) -> bool:
         """
         Update transaction record
         
@@ -187,7 +255,8 @@ class SupabaseClient:
             True if successful
         """
         try:
-            result = self.client.table('transactions')\
+            client = await self._get_client()
+            result = await client.table('transactions')\
                 .update(updates)\
                 .eq('id', transaction_id)\
                 .execute()
@@ -201,7 +270,7 @@ class SupabaseClient:
             logger.error(f"Error updating transaction: {e}")
             return False
     
-    def delete_transaction(self, transaction_id: str) -> bool:
+    async def delete_transaction(self, transaction_id: str) -> bool:
         """
         Delete transaction
         
@@ -212,7 +281,8 @@ class SupabaseClient:
             True if successful
         """
         try:
-            result = self.client.table('transactions')\
+            client = await self._get_client()
+            result = await client.table('transactions')\
                 .delete()\
                 .eq('id', transaction_id)\
                 .execute()
@@ -226,52 +296,64 @@ class SupabaseClient:
     
     # ============= ANALYTICS =============
     
-    def get_daily_summary(self, target_date: Optional[str] = None) -> Dict[str, Any]:
+    async def get_daily_summary(
+        self,
+        target_date: Optional[str] = None,
+        include_transactions: bool = True
+    ) -> Dict[str, Any]:
         """
         Get daily spending summary
-        
+
+        Totals are aggregated server-side via the daily_summary SQL
+        function instead of summing rows in Python.
+
         Args:
             target_date: Date in YYYY-MM-DD format (defaults to today)
-            
+            include_transactions: Also fetch the day's transaction rows
+
         Returns:
             Summary dictionary with totals
         """
         if not target_date:
             target_date = date.today().isoformat()
-        
+
         try:
-            transactions = self.get_transactions(
-                start_date=target_date,
-                end_date=target_date
-            )
-            
-            total_debit = sum(
-                t['amount'] for t in transactions 
-                if t['transaction_type'] == 'debit'
-            )
-            
-            total_credit = sum(
-                t['amount'] for t in transactions 
-                if t['transaction_type'] == 'credit'
-            )
-            
+            client = await self._get_client()
+            totals_query = client.rpc('daily_summary', {'d': target_date}).execute()
+
+            if include_transactions:
+                totals_result, transactions = await asyncio.gather(
+                    totals_query,
+                    self.get_transactions(
+                        start_date=target_date,
+                        end_date=target_date
+                    )
+                )
+            else:
+                totals_result = await totals_query
+                transactions = []
+
+            totals = (totals_result.data or [{}])[0]
+            total_debit = totals.get('total_debit') or 0
+            total_credit = totals.get('total_credit') or 0
+
             summary = {
                 'date': target_date,
                 'total_spent': total_debit,
                 'total_earned': total_credit,
                 'net': total_credit - total_debit,
-                'transaction_count': len(transactions),
+                'transaction_count': totals.get('cnt') or 0,
                 'transactions': transactions
             }
-            
+
             logger.info(f"✓ Daily summary for {target_date}: Spent {total_debit}, Earned {total_credit}")
             return summary
-            
+
         except Exception as e:
             logger.error(f"Error getting daily summary: {e}")
             return {}
     
-    def get_monthly_summary(self, year: int, month: int) -> Dict[str, Any]:
+    async def get_monthly_summary(self, year: int, month: int) -> Dict[str, Any]:
         """
         Get monthly spending summary
         
@@ -283,37 +365,27 @@ class SupabaseClient:
             Summary dictionary
         """
         try:
-            # Calculate date range
-            start_date = f"{year}-{month:02d}-01"
-            
-            # Get last day of month
+            # Get last day of month for the daily average
             import calendar
             last_day = calendar.monthrange(year, month)[1]
-            end_date = f"{year}-{month:02d}-{last_day}"
-            
-            transactions = self.get_transactions(
-                start_date=start_date,
-                end_date=end_date,
-                limit=1000
-            )
-            
-            total_debit = sum(
-                t['amount'] for t in transactions 
-                if t['transaction_type'] == 'debit'
-            )
-            
-            total_credit = sum(
-                t['amount'] for t in transactions 
-                if t['transaction_type'] == 'credit'
-            )
-            
+
+            # Aggregate server-side: two totals instead of up to 1000 rows
+            client = await self._get_client()
+            result = await client.rpc(
+                'monthly_summary', {'y': year, 'm': month}
+            ).execute()
+
+            totals = (result.data or [{}])[0]
+            total_debit = totals.get('total_debit') or 0
+            total_credit = totals.get('total_credit') or 0
+
             summary = {
                 'year': year,
                 'month': month,
                 'total_spent': total_debit,
                 'total_earned': total_credit,
                 'net': total_credit - total_debit,
-                'transaction_count': len(transactions),
+                'transaction_count': totals.get('cnt') or 0,
                 'average_daily_spend': total_debit / last_day if last_day else 0
             }
             
@@ -326,7 +398,7 @@ class SupabaseClient:
     
     # ============= USERS =============
     
-    def get_or_create_user(self, email: str) -> Optional[Dict]:
+    async def get_or_create_user(self, email: str) -> Optional[Dict]:
         """
         Get user or create if doesn't exist
         
@@ -338,7 +410,8 @@ class SupabaseClient:
         """
         try:
             # Try to get existing user
-            result = self.client.table('users')\
+            client = await self._get_client()
+            result = await client.table('users')\
                 .select('*')\
                 .eq('email', email)\
                 .execute()
@@ -347,7 +420,7 @@ class SupabaseClient:
                 return result.data[0]
             
             # Create new user
-            result = self.client.table('users')\
+            result = await client.table('users')\
                 .insert({'email': email, 'gmail_connected': True})\
                 .execute()
             
@@ -362,23 +435,20 @@ class SupabaseClient:
             return None
 
 
-# Singleton instance
-_supabase_client: Optional[SupabaseClient] = None
-
-
+@lru_cache(maxsize=1)
 def get_supabase_client() -> SupabaseClient:
     """Get singleton instance of SupabaseClient"""
-    global _supabase_client
-    if _supabase_client is None:
-        _supabase_client = SupabaseClient()
-    return _supabase_client
+    return SupabaseClient()
 
 
 if __name__ == "__main__":
     # Quick test
-    client = get_supabase_client()
-    client.test_connection()
-    
-    # Get today's summary
-    summary = client.get_daily_summary()
-    print(f"Today's spending: {summary.get('total_spent', 0)} INR")
\ No newline at end of file
+    async def main():
+        client = get_supabase_client()
+        await client.test_connection()
+
+        # Get today's summary
+        summary = await client.get_daily_summary()
+        print(f"Today's spending: {summary.get('total_spent', 0)} INR")
+
+    asyncio.run(main())
\ No newline at end of file
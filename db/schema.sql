@@ -93,6 +93,47 @@ CREATE INDEX IF NOT EXISTS idx_budgets_month_year ON budgets(month, year);
 CREATE INDEX IF NOT EXISTS idx_insights_user_id ON daily_insights(user_id);
 CREATE INDEX IF NOT EXISTS idx_insights_date ON daily_insights(insight_date);
 
+-- Filtered transaction listing (called from the API via PostgREST rpc);
+-- a named function lets Postgres reuse one cached plan across calls
+CREATE OR REPLACE FUNCTION transactions_filtered(
+    p_user_id UUID DEFAULT NULL,
+    p_start_date DATE DEFAULT NULL,
+    p_end_date DATE DEFAULT NULL,
+    p_type VARCHAR DEFAULT NULL,
+    p_limit INTEGER DEFAULT 100
+)
+RETURNS SETOF transactions AS $$
+    SELECT * FROM transactions
+    WHERE (p_user_id IS NULL OR user_id = p_user_id)
+      AND (p_start_date IS NULL OR transaction_date >= p_start_date)
+      AND (p_end_date IS NULL OR transaction_date <= p_end_date)
+      AND (p_type IS NULL OR transaction_type = p_type)
+    ORDER BY transaction_date DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Server-side summary aggregation (called from the API via PostgREST rpc)
+CREATE OR REPLACE FUNCTION daily_summary(d DATE)
+RETURNS TABLE(total_debit NUMERIC, total_credit NUMERIC, cnt INTEGER) AS $$
+    SELECT
+        COALESCE(SUM(amount) FILTER (WHERE transaction_type = 'debit'), 0),
+        COALESCE(SUM(amount) FILTER (WHERE transaction_type = 'credit'), 0),
+        COUNT(*)::INTEGER
+    FROM transactions
+    WHERE transaction_date = d;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION monthly_summary(y INTEGER, m INTEGER)
+RETURNS TABLE(total_debit NUMERIC, total_credit NUMERIC, cnt INTEGER) AS $$
+    SELECT
+        COALESCE(SUM(amount) FILTER (WHERE transaction_type = 'debit'), 0),
+        COALESCE(SUM(amount) FILTER (WHERE transaction_type = 'credit'), 0),
+        COUNT(*)::INTEGER
+    FROM transactions
+    WHERE EXTRACT(YEAR FROM transaction_date) = y
+      AND EXTRACT(MONTH FROM transaction_date) = m;
+$$ LANGUAGE sql STABLE;
+
 -- Update timestamp trigger
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
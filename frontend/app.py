@@ -1,10 +1,13 @@
 """BudgetOps AI - Streamlit Dashboard"""
 import streamlit as st
 import requests
+import httpx
+import asyncio
 import pandas as pd
 import plotly.express as px
 from datetime import date, datetime
 import pytz
+import json
 import os
 
 # Page config
@@ -17,6 +20,50 @@ st.set_page_config(
 # API base URL
 API_URL = os.getenv("API_URL", "http://localhost:8000")
 
+
+@st.cache_data(ttl=60)
+def prefetch(date_str: str) -> dict:
+    """Fetch all tab payloads concurrently (latency = max, not sum),
+    with safe defaults on non-200 so one failed call can't tear down
+    the rest of the page"""
+    async def fetch_all():
+        async with httpx.AsyncClient(base_url=API_URL, timeout=10) as client:
+            return await asyncio.gather(
+                client.get("/transactions/daily-summary", params={"target_date": date_str}),
+                client.get("/insights/daily", params={"target_date": date_str}),
+                client.get("/transactions/transactions", params={"limit": 50}),
+            )
+
+    try:
+        summary_r, insight_r, txn_r = asyncio.run(fetch_all())
+    except httpx.HTTPError:
+        # API unreachable (connect error, timeout): same empty defaults
+        # as a non-200, so the page still renders
+        return {"summary": {}, "insight": {}, "txns": []}
+    return {
+        "summary": summary_r.json() if summary_r.status_code == 200 else {},
+        "insight": insight_r.json() if insight_r.status_code == 200 else {},
+        "txns": txn_r.json().get('transactions', []) if txn_r.status_code == 200 else [],
+    }
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Shared Session so API calls reuse pooled keep-alive connections
+    instead of paying a TCP/TLS handshake each time"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=60)
+def build_df(records_json: str) -> pd.DataFrame:
+    """Build a DataFrame from JSON records; cached so widget-driven
+    rerenders don't redo construction and dtype inference"""
+    return pd.DataFrame(json.loads(records_json))
+
 # Title
 st.title("💰 BudgetOps AI - Budget Tracker")
 st.markdown("AI-powered expense tracking and insights")
@@ -27,13 +74,17 @@ with st.sidebar:
     
     if st.button("🔄 Process New Emails"):
         with st.spinner("Processing emails..."):
-            response = requests.post(f"{API_URL}/transactions/process-emails", json={
+            response = get_session().post(f"{API_URL}/transactions/process-emails", json={
                 "sender": "alerts@hdfcbank.net",
                 "max_results": 10,
                 "mark_as_read": True
             })
             if response.status_code == 200:
                 data = response.json()
+                # Drop cached page data so the new transactions show up
+                # immediately instead of after the TTL expires
+                prefetch.clear()
+                build_df.clear()
                 st.success(f"✓ Processed {data['inserted']} new transactions!")
             else:
                 st.error("Failed to process emails")
@@ -44,17 +95,15 @@ with st.sidebar:
 # Main content
 tabs = st.tabs(["📊 Dashboard", "💡 Insights", "📋 Transactions"])
 
+# One concurrent fetch for all three tabs
+page_data = prefetch(str(selected_date))
+summary = page_data["summary"]
+
 # Tab 1: Dashboard
 with tabs[0]:
     st.header(f"Daily Summary - {selected_date}")
-    
-    # Fetch daily summary
-    response = requests.get(f"{API_URL}/transactions/daily-summary", 
-                           params={"target_date": str(selected_date)})
-    
-    if response.status_code == 200:
-        summary = response.json()
-        
+
+    if summary:
         # Metrics
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -68,14 +117,18 @@ with tabs[0]:
         
         # Transaction chart
         if summary.get('transactions'):
-            df = pd.DataFrame(summary['transactions'])
+            df = build_df(json.dumps(summary['transactions'], sort_keys=True))
             
             # Category breakdown
             if 'category' in df.columns:
                 st.subheader("Category Breakdown")
                 debit_df = df[df['transaction_type'] == 'debit']
                 if not debit_df.empty:
-                    category_sum = debit_df.groupby('category')['amount'].sum().reset_index()
+                    # float64 keeps the sum on the fast numeric path (amounts
+                    # arrive as strings/objects from JSON); sort=False skips
+                    # the post-aggregation key sort the pie chart doesn't need
+                    debit_df = debit_df.assign(amount=debit_df['amount'].astype('float64'))
+                    category_sum = debit_df.groupby('category', sort=False)['amount'].sum().reset_index()
                     fig = px.pie(category_sum, values='amount', names='category',
                                 title='Spending by Category')
                     st.plotly_chart(fig, use_container_width=True)
@@ -83,32 +136,23 @@ with tabs[0]:
 # Tab 2: Insights
 with tabs[1]:
     st.header("💡 AI Insights")
-    
-    # Daily insight
-    response = requests.get(f"{API_URL}/insights/daily",
-                          params={"target_date": str(selected_date)})
-    
-    if response.status_code == 200:
-        data = response.json()
-        st.info(data.get('insight', 'No insight available'))
-        
-        with st.expander("View Details"):
-            st.json(data.get('summary', {}))
+
+    st.info(page_data["insight"].get('insight', 'No insight available'))
+
+    with st.expander("View Details"):
+        st.json(page_data["insight"].get('summary', {}))
 
 # Tab 3: Transactions
 with tabs[2]:
     st.header("📋 Recent Transactions")
-    
-    response = requests.get(f"{API_URL}/transactions/transactions", 
-                          params={"limit": 50})
-    
-    if response.status_code == 200:
-        data = response.json()
-        transactions = data.get('transactions', [])
-        
-        if transactions:
-            df = pd.DataFrame(transactions)
-            display_cols = ['transaction_date', 'amount', 'transaction_type', 
-                          'to_merchant', 'category']
-            st.dataframe(df[display_cols] if all(c in df.columns for c in display_cols) else df, 
-                        use_container_width=True)
\ No newline at end of file
+
+    transactions = page_data["txns"]
+
+    if transactions:
+        df = build_df(json.dumps(transactions, sort_keys=True))
+        display_cols = ['transaction_date', 'amount', 'transaction_type',
+                        'to_merchant', 'category']
+        # reindex tolerates missing columns; dropna removes the all-NaN
+        # placeholders it adds for them
+        st.dataframe(df.reindex(columns=display_cols).dropna(axis=1, how='all'),
+                     use_container_width=True)
\ No newline at end of file
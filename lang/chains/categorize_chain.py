@@ -3,19 +3,38 @@ Transaction Categorization Chain
 Uses Gemini to categorize transactions into spending categories
 """
 
-from typing import Dict, List, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+from functools import partial
+from typing import Dict, List, Literal, Optional, get_args
+
 from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
-from utils.env_loader import get_env_loader
+from utils.llm_pool import get_llm
 from utils.logger import logger
 
 
+# Closed category set: the schema constrains Gemini's output and pydantic
+# rejects anything outside it before it can reach the database
+CategoryLiteral = Literal[
+    "Food & Dining",
+    "Groceries",
+    "Transportation",
+    "Shopping",
+    "Entertainment",
+    "Bills & Utilities",
+    "Healthcare",
+    "Education",
+    "Travel",
+    "Investment",
+    "Transfer",
+    "Others",
+]
+
+
 class CategoryData(BaseModel):
     """Transaction category data"""
-    category: str = Field(description="Transaction category")
+    category: CategoryLiteral = Field(description="Transaction category")
     sub_category: Optional[str] = Field(description="Sub-category if applicable", default=None)
     confidence: float = Field(description="Confidence score 0-1", default=1.0)
 
@@ -23,66 +42,164 @@ class CategoryData(BaseModel):
 class TransactionCategorizer:
     """Categorize transactions using AI"""
     
-    # Predefined categories
-    CATEGORIES = [
-        "Food & Dining",
-        "Groceries",
-        "Transportation",
-        "Shopping",
-        "Entertainment",
-        "Bills & Utilities",
-        "Healthcare",
-        "Education",
-        "Travel",
-        "Investment",
-        "Transfer",
-        "Others"
-    ]
-    
+    # Predefined categories (derived from the schema's Literal so the
+    # prompt and the validator can't drift apart)
+    CATEGORIES = list(get_args(CategoryLiteral))
+
+    # Repeated merchants (Swiggy, Uber, ...) are the common case; cap the
+    # cache rather than letting it grow with transaction history
+    CACHE_MAX_ENTRIES = 4096
+
+    # Categorization prompts issued to Gemini concurrently per batch
+    MAX_CONCURRENCY = 8
+
+    # Deterministic merchant → category rules; matched as substrings of
+    # the lowercased merchant, no LLM round trip needed on a hit
+    MERCHANT_RULES: Dict[str, str] = {
+        "swiggy": "Food & Dining",
+        "zomato": "Food & Dining",
+        "dominos": "Food & Dining",
+        "mcdonald": "Food & Dining",
+        "zepto": "Groceries",
+        "blinkit": "Groceries",
+        "bigbasket": "Groceries",
+        "dmart": "Groceries",
+        "uber": "Transportation",
+        "ola": "Transportation",
+        "rapido": "Transportation",
+        "irctc": "Travel",
+        "makemytrip": "Travel",
+        "amazon": "Shopping",
+        "flipkart": "Shopping",
+        "myntra": "Shopping",
+        "netflix": "Entertainment",
+        "spotify": "Entertainment",
+        "bookmyshow": "Entertainment",
+        "jio": "Bills & Utilities",
+        "airtel": "Bills & Utilities",
+        "bescom": "Bills & Utilities",
+        "electricity": "Bills & Utilities",
+        "pharmacy": "Healthcare",
+        "apollo": "Healthcare",
+        "zerodha": "Investment",
+        "groww": "Investment",
+    }
+
     def __init__(self):
         """Initialize categorizer with Gemini"""
-        config = get_env_loader().get_config()
-        
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=config["google_api_key"],
-            temperature=0.1,
-        )
-        
-        self.output_parser = PydanticOutputParser(pydantic_object=CategoryData)
+        # Shared client, same temperature as the parser
+        self.llm = get_llm(temperature=0.1)
+
+        # Native structured output: Gemini fills the CategoryData schema
+        # directly, no format-instruction tokens and no JSON re-parsing
+        self.structured_llm = self.llm.with_structured_output(CategoryData)
+
         self.prompt = self._create_prompt_template()
-        
+        self._category_cache: Dict[tuple, Dict] = {}
+
+        # Static prompt pieces, computed once instead of per transaction
+        self._categories_str = "\n".join(f"- {cat}" for cat in self.CATEGORIES)
+        self._format_prompt = partial(
+            self.prompt.format_messages,
+            categories=self._categories_str,
+        )
+
         logger.info("Transaction categorizer initialized")
+
+    @staticmethod
+    def _cache_key(transaction: Dict) -> tuple:
+        """
+        Build the cache key for a transaction
+
+        Near-duplicate transactions (same merchant, similar amount, same
+        type) categorize identically, so key on the normalized merchant,
+        a 100-INR amount bucket, and the transaction type.
+
+        Args:
+            transaction: Transaction dictionary
+
+        Returns:
+            Hashable cache key
+        """
+        merchant = str(
+            transaction.get('to', transaction.get('to_merchant', '')) or ''
+        ).strip().lower()
+        amount_bucket = int(float(transaction.get('amount', 0) or 0) // 100)
+        transaction_type = transaction.get('transaction_type', 'unknown')
+
+        return (merchant, amount_bucket, transaction_type)
+
+    def _cache_store(self, key: tuple, category_data: Dict) -> None:
+        """
+        Store a categorization result, evicting oldest entries at capacity
+
+        Args:
+            key: Cache key from _cache_key
+            category_data: Categorization result to store
+        """
+        if len(self._category_cache) >= self.CACHE_MAX_ENTRIES:
+            self._category_cache.pop(next(iter(self._category_cache)))
+        self._category_cache[key] = category_data
+
+    @classmethod
+    def _rule_category(cls, transaction: Dict) -> Optional[Dict]:
+        """
+        Deterministic categorization for well-known merchants
+
+        Args:
+            transaction: Transaction dictionary
+
+        Returns:
+            Category data on a rule hit, else None
+        """
+        merchant_lc = str(
+            transaction.get('to', transaction.get('to_merchant', '')) or ''
+        ).lower()
+
+        if not merchant_lc:
+            return None
+
+        for key, category in cls.MERCHANT_RULES.items():
+            if key in merchant_lc:
+                return {
+                    'category': category,
+                    'sub_category': None,
+                    'confidence': 0.95,
+                }
+        return None
     
     def _create_prompt_template(self) -> ChatPromptTemplate:
-        """Create prompt for categorization"""
-        
-        categories_str = "\n".join([f"- {cat}" for cat in self.CATEGORIES])
-        
-        template = """You are an expert at categorizing financial transactions.
+        """
+        Create prompt for categorization
+
+        Static instructions (categories, rules, format) go in the system
+        message and only the transaction fields vary per call, keeping
+        the prefix identical so Gemini's implicit caching applies.
+        """
+
+        system = """You are an expert at categorizing financial transactions.
 
 Available categories:
 {categories}
 
 Analyze the following transaction and assign it to the most appropriate category.
 
-Transaction Details:
-- Amount: {amount} INR
-- Type: {transaction_type}
-- Merchant: {merchant}
-- Description: {description}
-
 Consider:
 1. The merchant name (e.g., "Swiggy" → Food & Dining, "Uber" → Transportation)
 2. Transaction type (UPI to individuals might be Transfer)
 3. Amount patterns (small amounts at food places → Food & Dining)
 
-{format_instructions}
-
 Return the category, optional sub-category, and confidence score (0-1).
 """
-        
-        return ChatPromptTemplate.from_template(template)
+
+        human = """Transaction Details:
+- Amount: {amount} INR
+- Type: {transaction_type}
+- Merchant: {merchant}
+- Description: {description}
+"""
+
+        return ChatPromptTemplate.from_messages([("system", system), ("human", human)])
     
     def categorize_transaction(
         self,
@@ -97,52 +214,125 @@ Return the category, optional sub-category, and confidence score (0-1).
         Returns:
             Category data or None
         """
+        # Deterministic merchants skip the LLM entirely
+        rule_hit = self._rule_category(transaction)
+        if rule_hit is not None:
+            logger.debug(f"Merchant rule hit -> {rule_hit['category']}")
+            return rule_hit
+
+        # Return cached result for repeated merchants without an LLM call
+        cache_key = self._cache_key(transaction)
+        cached = self._category_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Category cache hit: {cache_key[0]} -> {cached['category']}")
+            return dict(cached)
+
         try:
-            # Extract merchant name
-            merchant = transaction.get('to', transaction.get('to_merchant', 'Unknown'))
-            description = transaction.get('description', '')
-            
-            # Format prompt
-            formatted_prompt = self.prompt.format(
-                categories="\n".join([f"- {cat}" for cat in self.CATEGORIES]),
-                amount=transaction.get('amount', 0),
-                transaction_type=transaction.get('transaction_type', 'unknown'),
-                merchant=merchant,
-                description=description,
-                format_instructions=self.output_parser.get_format_instructions()
-            )
-            
-            # Get response
-            response = self.llm.invoke(formatted_prompt)
-            parsed = self.output_parser.parse(response.content)
-            
+            messages = self._build_prompt(transaction)
+
+            # Get structured response (already a CategoryData instance)
+            parsed = self.structured_llm.invoke(messages)
+
             result = parsed.model_dump()
-            
+            self._cache_store(cache_key, result)
+
             logger.info(f"✓ Categorized as: {result['category']} (confidence: {result['confidence']:.2f})")
             return result
             
         except Exception as e:
             logger.error(f"Error categorizing transaction: {e}")
             return None
-    
+
+    def _build_prompt(self, transaction: Dict) -> list:
+        """
+        Format the categorization prompt for one transaction
+
+        Args:
+            transaction: Transaction dictionary
+
+        Returns:
+            Formatted message list
+        """
+        merchant = transaction.get('to', transaction.get('to_merchant', 'Unknown'))
+        description = transaction.get('description', '')
+
+        return self._format_prompt(
+            amount=transaction.get('amount', 0),
+            transaction_type=transaction.get('transaction_type', 'unknown'),
+            merchant=merchant,
+            description=description,
+        )
+
     def categorize_batch(
         self,
         transactions: List[Dict]
     ) -> List[Dict]:
         """
-        Categorize multiple transactions
-        
+        Categorize multiple transactions (sync shim over acategorize_batch)
+
         Args:
             transactions: List of transaction dictionaries
-            
+
+        Returns:
+            List of transactions with categories added
+        """
+        return asyncio.run(self.acategorize_batch(transactions))
+
+    async def acategorize_batch(
+        self,
+        transactions: List[Dict]
+    ) -> List[Dict]:
+        """
+        Categorize multiple transactions concurrently
+
+        Rule and cache hits are resolved up front; only the misses are sent to
+        Gemini, all in one llm.abatch call capped at MAX_CONCURRENCY,
+        instead of one blocking round trip per transaction.
+
+        Args:
+            transactions: List of transaction dictionaries
+
         Returns:
             List of transactions with categories added
         """
+        results: Dict[int, Optional[Dict]] = {}
+        pending: List[int] = []
+
+        for i, transaction in enumerate(transactions):
+            rule_hit = self._rule_category(transaction)
+            if rule_hit is not None:
+                results[i] = rule_hit
+                continue
+
+            cached = self._category_cache.get(self._cache_key(transaction))
+            if cached is not None:
+                results[i] = dict(cached)
+            else:
+                pending.append(i)
+
+        if pending:
+            prompts = [self._build_prompt(transactions[i]) for i in pending]
+            responses = await self.structured_llm.abatch(
+                prompts,
+                config={"max_concurrency": self.MAX_CONCURRENCY},
+                return_exceptions=True,
+            )
+
+            for i, response in zip(pending, responses):
+                try:
+                    if isinstance(response, Exception):
+                        raise response
+                    result = response.model_dump()
+                    self._cache_store(self._cache_key(transactions[i]), result)
+                    results[i] = result
+                except Exception as e:
+                    logger.error(f"Error categorizing transaction: {e}")
+                    results[i] = None
+
         categorized = []
-        
-        for transaction in transactions:
-            category_data = self.categorize_transaction(transaction)
-            
+        for i, transaction in enumerate(transactions):
+            category_data = results.get(i)
+
             if category_data:
                 transaction['category'] = category_data['category']
                 transaction['sub_category'] = category_data.get('sub_category')
@@ -151,9 +341,9 @@ Return the category, optional sub-category, and confidence score (0-1).
                 transaction['category'] = 'Others'
                 transaction['sub_category'] = None
                 transaction['category_confidence'] = 0.5
-            
+
             categorized.append(transaction)
-        
+
         logger.info(f"✓ Categorized {len(categorized)} transactions")
         return categorized
 
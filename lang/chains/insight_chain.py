@@ -3,28 +3,44 @@ Insights Generation Chain
 Generates AI-powered daily spending insights
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from datetime import date, datetime
-from langchain_google_genai import ChatGoogleGenerativeAI
+import heapq
+import operator
+
+import pandas as pd
 from langchain.prompts import ChatPromptTemplate
 
-from utils.env_loader import get_env_loader
+from utils.llm_pool import get_llm
 from utils.logger import logger
 
 
 class InsightGenerator:
     """Generate spending insights using AI"""
-    
+
+    # Categories shown in insight prompts; the rest add tokens, not signal
+    TOP_CATEGORIES = 10
+
+    @staticmethod
+    def _is_empty(summary: Dict) -> bool:
+        """
+        Whether a summary has no activity worth sending to the LLM
+
+        Args:
+            summary: Daily or monthly summary dict
+
+        Returns:
+            True if there is nothing to analyze
+        """
+        if not summary.get('transaction_count'):
+            return True
+        return not summary.get('total_spent') and not summary.get('total_earned')
+
     def __init__(self):
         """Initialize insight generator with Gemini"""
-        config = get_env_loader().get_config()
-        
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=config["google_api_key"],
-            temperature=0.7,  # Higher temperature for creative insights
-        )
-        
+        # Shared client; higher temperature for creative insights
+        self.llm = get_llm(temperature=0.7)
+
         self.daily_prompt = self._create_daily_prompt()
         self.monthly_prompt = self._create_monthly_prompt()
         
@@ -100,41 +116,13 @@ Be specific with numbers and constructive with feedback."""
         Returns:
             AI-generated insight text
         """
+        # Nothing to analyze — skip the LLM round trip entirely
+        if self._is_empty(summary):
+            return f"No transactions recorded for {summary.get('date', 'today')}."
+
         try:
-            # Calculate category breakdown
-            if transactions:
-                category_totals = {}
-                for t in transactions:
-                    if t.get('transaction_type') == 'debit':
-                        cat = t.get('category', 'Others')
-                        category_totals[cat] = category_totals.get(cat, 0) + t.get('amount', 0)
-                
-                category_breakdown = "\n".join([
-                    f"- {cat}: ₹{amount:.2f}"
-                    for cat, amount in sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-                ])
-                
-                # Create transaction summary
-                trans_summary = "\n".join([
-                    f"- ₹{t.get('amount', 0)} to {t.get('to_merchant', 'Unknown')[:30]}"
-                    for t in transactions[:5]  # Top 5 transactions
-                    if t.get('transaction_type') == 'debit'
-                ])
-            else:
-                category_breakdown = "No category data available"
-                trans_summary = "No transactions available"
-            
-            # Format prompt
-            formatted_prompt = self.daily_prompt.format(
-                date=summary.get('date', date.today().isoformat()),
-                total_spent=summary.get('total_spent', 0),
-                total_earned=summary.get('total_earned', 0),
-                net=summary.get('net', 0),
-                transaction_count=summary.get('transaction_count', 0),
-                category_breakdown=category_breakdown,
-                transactions_summary=trans_summary
-            )
-            
+            formatted_prompt = self._format_daily_prompt(summary, transactions)
+
             # Generate insight
             response = self.llm.invoke(formatted_prompt)
             insight = response.content.strip()
@@ -145,7 +133,88 @@ Be specific with numbers and constructive with feedback."""
         except Exception as e:
             logger.error(f"Error generating daily insight: {e}")
             return f"Today you spent ₹{summary.get('total_spent', 0)} across {summary.get('transaction_count', 0)} transactions."
-    
+
+    def generate_daily_insight_stream(
+        self,
+        summary: Dict,
+        transactions: Optional[List[Dict]] = None
+    ) -> Iterator[str]:
+        """
+        Stream the daily insight token by token
+
+        Same prompt as generate_daily_insight but yields text chunks as
+        Gemini produces them, so a consumer (e.g. a streaming endpoint or
+        st.write_stream) can render at time-to-first-token instead of
+        waiting for the full generation.
+
+        Args:
+            summary: Daily summary dict from Supabase
+            transactions: Optional list of transactions
+
+        Yields:
+            Insight text chunks
+        """
+        if self._is_empty(summary):
+            yield f"No transactions recorded for {summary.get('date', 'today')}."
+            return
+
+        formatted_prompt = self._format_daily_prompt(summary, transactions)
+
+        for chunk in self.llm.stream(formatted_prompt):
+            if chunk.content:
+                yield chunk.content
+
+    def _format_daily_prompt(
+        self,
+        summary: Dict,
+        transactions: Optional[List[Dict]] = None
+    ) -> str:
+        """
+        Build the formatted daily insight prompt
+
+        Args:
+            summary: Daily summary dict from Supabase
+            transactions: Optional list of transactions
+
+        Returns:
+            Formatted prompt string
+        """
+        # Calculate category breakdown (vectorized groupby instead of
+        # a per-transaction Python loop)
+        if transactions:
+            df = pd.DataFrame(transactions)
+            debit = df[df['transaction_type'] == 'debit']
+
+            # nlargest is O(N log K) vs a full O(N log N) sort
+            category_totals = debit.fillna({'category': 'Others'})\
+                .groupby('category', sort=False)['amount']\
+                .sum()\
+                .nlargest(self.TOP_CATEGORIES)
+
+            category_breakdown = "\n".join(
+                f"- {cat}: ₹{amount:.2f}"
+                for cat, amount in category_totals.items()
+            )
+
+            # Create transaction summary (top 5 debits)
+            trans_summary = "\n".join(
+                f"- ₹{row.amount} to {str(row.to_merchant)[:30]}"
+                for row in debit.head(5).itertuples()
+            )
+        else:
+            category_breakdown = "No category data available"
+            trans_summary = "No transactions available"
+
+        return self.daily_prompt.format(
+            date=summary.get('date', date.today().isoformat()),
+            total_spent=summary.get('total_spent', 0),
+            total_earned=summary.get('total_earned', 0),
+            net=summary.get('net', 0),
+            transaction_count=summary.get('transaction_count', 0),
+            category_breakdown=category_breakdown,
+            transactions_summary=trans_summary
+        )
+
     def generate_monthly_insight(
         self,
         summary: Dict,
@@ -161,13 +230,24 @@ Be specific with numbers and constructive with feedback."""
         Returns:
             AI-generated insight text
         """
+        # Nothing to analyze — skip the LLM round trip entirely
+        if self._is_empty(summary):
+            month = summary.get('month', date.today().month)
+            year = summary.get('year', date.today().year)
+            return f"No transactions recorded for {month}/{year}."
+
         try:
-            # Format category breakdown
+            # Format category breakdown (top K only, no full sort)
             if category_breakdown:
-                cat_text = "\n".join([
+                top_categories = heapq.nlargest(
+                    self.TOP_CATEGORIES,
+                    category_breakdown.items(),
+                    key=operator.itemgetter(1)
+                )
+                cat_text = "\n".join(
                     f"- {cat}: ₹{amount:.2f}"
-                    for cat, amount in sorted(category_breakdown.items(), key=lambda x: x[1], reverse=True)
-                ])
+                    for cat, amount in top_categories
+                )
             else:
                 cat_text = "No category data available"
             
@@ -3,17 +3,21 @@ Email Parser Chain
 Uses LangChain + Gemini to parse transaction emails into structured data
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, List, Any, Optional
 from datetime import datetime
+from zoneinfo import ZoneInfo
+import asyncio
 import json
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
-from utils.env_loader import get_env_loader
+from utils.llm_pool import get_llm
 from utils.logger import logger
+from utils.parse_cache import get_parse_cache
+
+# C-backed stdlib timezone, created once instead of per parse via pytz
+_IST = ZoneInfo("Asia/Kolkata")
 
 
 class TransactionData(BaseModel):
@@ -28,32 +32,49 @@ class TransactionData(BaseModel):
     description: Optional[str] = Field(description="Additional transaction details", default=None)
 
 
+class TransactionBatch(BaseModel):
+    """Batch of transactions parsed from multiple messages in one call"""
+    transactions: List[TransactionData] = Field(
+        description="One entry per numbered transaction message, in order"
+    )
+
+
 class EmailParser:
     """Parse transaction emails using LangChain + Gemini"""
-    
+
+    # Emails parsed per LLM call; one round trip covers the whole chunk
+    BATCH_SIZE = 10
+
+    # Chunk prompts issued to Gemini concurrently per batch call
+    MAX_CONCURRENCY = 8
+
     def __init__(self):
         """Initialize parser with Gemini model"""
-        config = get_env_loader().get_config()
-        
-        # Initialize Gemini model
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=config["google_api_key"],
-            temperature=0.1,  # Low temperature for consistent parsing
-        )
-        
-        # Initialize output parser
-        self.output_parser = PydanticOutputParser(pydantic_object=TransactionData)
-        
-        # Create prompt template
+        # Shared client; low temperature for consistent parsing
+        self.llm = get_llm(temperature=0.1)
+
+        # Native structured output: Gemini fills the JSON schema directly,
+        # no format-instruction tokens and no free-form JSON re-parsing
+        self.structured_llm = self.llm.with_structured_output(TransactionData)
+        self.batch_structured_llm = self.llm.with_structured_output(TransactionBatch)
+
+        # Create prompt templates
         self.prompt = self._create_prompt_template()
-        
+        self.batch_prompt = self._create_batch_prompt_template()
+
         logger.info("Email parser initialized with Gemini")
     
     def _create_prompt_template(self) -> ChatPromptTemplate:
-        """Create prompt template for email parsing"""
-        
-        template = """You are an expert at extracting structured transaction data from bank alert messages.
+        """
+        Create prompt template for email parsing
+
+        The static instructions live in the system message and the
+        per-email fields in the human message, so the prompt prefix is
+        byte-identical across calls and Gemini's implicit prefix caching
+        can skip re-processing it.
+        """
+
+        system = """You are an expert at extracting structured transaction data from bank alert messages.
 
 Extract the following information from the transaction message:
 - amount: Numeric value in INR (e.g., 30 for Rs.30.00)
@@ -71,19 +92,53 @@ Rules:
 3. If a field is not found in the message, set it to null
 4. For dates: Convert DD-MM-YY format to YYYY-MM-DD (e.g., 30-10-25 → 2025-10-30)
 5. Extract amount as a number without currency symbols
+"""
 
-Current timestamp: {current_timestamp}
+        human = """Current timestamp: {current_timestamp}
 
 Transaction message:
 {transaction_message}
+"""
+
+        return ChatPromptTemplate.from_messages([("system", system), ("human", human)])
+
+    def _create_batch_prompt_template(self) -> ChatPromptTemplate:
+        """
+        Create prompt template for parsing several emails at once
+
+        Same system/human split as the single-email template so the
+        static prefix stays cacheable across batch calls.
+        """
+
+        system = """You are an expert at extracting structured transaction data from bank alert messages.
+
+You will receive several numbered transaction messages. For EACH message, extract:
+- amount: Numeric value in INR (e.g., 30 for Rs.30.00)
+- transaction_type: Either "credit" or "debit" based on the message wording
+- card: Full card name and number (e.g., 'HDFC Bank RuPay Credit Card XX7276')
+- to: Merchant or recipient name, include UPI ID if present (e.g., 'Deccan spice (paytmqr6j4s3b@ptys)')
+- transaction_reference_number: Alphanumeric transaction reference or ID
+- date: Date in YYYY-MM-DD format (convert from DD-MM-YY if needed)
+- timestamp: Use the provided current timestamp
+- description: Any additional relevant details
+
+Rules:
+1. Clean up spaces and punctuation
+2. Ensure consistent capitalization
+3. If a field is not found in the message, set it to null
+4. For dates: Convert DD-MM-YY format to YYYY-MM-DD (e.g., 30-10-25 → 2025-10-30)
+5. Extract amount as a number without currency symbols
+6. Return exactly one entry per message, in the same order as the messages
+"""
 
-{format_instructions}
+        human = """Current timestamp: {current_timestamp}
 
-Return only valid JSON with the extracted data.
+Transaction messages:
+{transaction_messages}
 """
-        
-        return ChatPromptTemplate.from_template(template)
-    
+
+        return ChatPromptTemplate.from_messages([("system", system), ("human", human)])
+
     def parse_email(
         self,
         email_text: str,
@@ -100,27 +155,19 @@ Return only valid JSON with the extracted data.
             Dictionary with parsed transaction data, or None if parsing fails
         """
         if not current_timestamp:
-            # Use Asia/Kolkata timezone
-            from datetime import datetime
-            import pytz
-            tz = pytz.timezone('Asia/Kolkata')
-            current_timestamp = datetime.now(tz).strftime('%Y-%m-%d %H:%M:%S')
+            current_timestamp = datetime.now(_IST).strftime('%Y-%m-%d %H:%M:%S')
         
         try:
             # Format prompt
-            formatted_prompt = self.prompt.format(
+            messages = self.prompt.format_messages(
                 transaction_message=email_text,
                 current_timestamp=current_timestamp,
-                format_instructions=self.output_parser.get_format_instructions()
             )
-            
-            # Get LLM response
+
+            # Get structured response (already a TransactionData instance)
             logger.debug(f"Parsing email: {email_text[:100]}...")
-            response = self.llm.invoke(formatted_prompt)
-            
-            # Parse response
-            parsed_data = self.output_parser.parse(response.content)
-            
+            parsed_data = self.structured_llm.invoke(messages)
+
             # Convert to dict
             result = parsed_data.model_dump()
             
@@ -131,39 +178,225 @@ Return only valid JSON with the extracted data.
             logger.error(f"Error parsing email: {e}")
             logger.debug(f"Email text was: {email_text[:200]}...")
             return None
-    
+
+    async def aparse_email(
+        self,
+        email_text: str,
+        current_timestamp: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Parse email text to extract transaction data (async)
+
+        Args:
+            email_text: Raw email text (snippet or body)
+            current_timestamp: Optional timestamp (defaults to now)
+
+        Returns:
+            Dictionary with parsed transaction data, or None if parsing fails
+        """
+        if not current_timestamp:
+            current_timestamp = datetime.now(_IST).strftime('%Y-%m-%d %H:%M:%S')
+
+        try:
+            messages = self.prompt.format_messages(
+                transaction_message=email_text,
+                current_timestamp=current_timestamp,
+            )
+
+            logger.debug(f"Parsing email: {email_text[:100]}...")
+            parsed_data = await self.structured_llm.ainvoke(messages)
+            result = parsed_data.model_dump()
+
+            logger.success(f"Parsed transaction: {result['amount']} INR, {result['transaction_type']}")
+            return result
+
+        except Exception as e:
+            logger.error(f"Error parsing email: {e}")
+            logger.debug(f"Email text was: {email_text[:200]}...")
+            return None
+
     def parse_email_batch(
         self,
         emails: list,
         use_snippet: bool = True
+    ) -> list:
+        """
+        Parse multiple emails in batch (sync shim over aparse_email_batch)
+
+        Args:
+            emails: List of email dictionaries from GmailService
+            use_snippet: Whether to use snippet or full body
+
+        Returns:
+            List of parsed transaction data
+        """
+        return asyncio.run(self.aparse_email_batch(emails, use_snippet))
+
+    async def aparse_email_batch(
+        self,
+        emails: list,
+        use_snippet: bool = True
     ) -> list:
         """
         Parse multiple emails in batch
-        
+
+        Previously parsed emails are served from the persistent parse
+        cache; the rest are chunked into multi-document prompts of
+        BATCH_SIZE messages each and sent through one llm.abatch call so
+        the chunks run against Gemini concurrently (capped at
+        MAX_CONCURRENCY) instead of sequentially.
+
         Args:
             emails: List of email dictionaries from GmailService
             use_snippet: Whether to use snippet or full body
-        
+
         Returns:
             List of parsed transaction data
         """
+        if not emails:
+            return []
+
+        # Re-runs over the same mailbox skip the LLM for cached emails
+        cache = get_parse_cache()
+        cached = cache.get_many(email['id'] for email in emails)
+        if cached:
+            logger.info(f"Parse cache hit for {len(cached)}/{len(emails)} emails")
+
+        pending = [email for email in emails if email['id'] not in cached]
+
+        new_results = []
+        if pending:
+            current_timestamp = datetime.now(_IST).strftime('%Y-%m-%d %H:%M:%S')
+
+            chunks = [
+                pending[start:start + self.BATCH_SIZE]
+                for start in range(0, len(pending), self.BATCH_SIZE)
+            ]
+            chunk_texts = [
+                [email['snippet'] if use_snippet else email['body'] for email in chunk]
+                for chunk in chunks
+            ]
+            prompts = [
+                self._build_chunk_prompt(texts, current_timestamp)
+                for texts in chunk_texts
+            ]
+
+            logger.debug(f"Parsing {len(pending)} email(s) in {len(chunks)} chunk(s)...")
+            responses = await self.batch_structured_llm.abatch(
+                prompts,
+                config={"max_concurrency": self.MAX_CONCURRENCY},
+                return_exceptions=True,
+            )
+
+            for chunk, texts, response in zip(chunks, chunk_texts, responses):
+                try:
+                    if isinstance(response, Exception):
+                        raise response
+                    new_results.extend(self._collect_chunk(chunk, response))
+                except Exception as e:
+                    logger.error(f"Error parsing email batch, falling back to per-email: {e}")
+                    new_results.extend(
+                        await self._aparse_emails_individually(chunk, texts, current_timestamp)
+                    )
+
+            # One commit for the whole batch
+            cache.put_many(new_results)
+
+        parsed_by_id = {result['email_id']: result for result in new_results}
         results = []
-        
         for email in emails:
-            # Choose text source
-            text = email['snippet'] if use_snippet else email['body']
-            
-            # Parse email
-            parsed = self.parse_email(text)
-            
+            parsed = cached.get(email['id']) or parsed_by_id.get(email['id'])
+            if parsed:
+                results.append(parsed)
+
+        logger.info(f"Parsed {len(results)}/{len(emails)} emails successfully")
+        return results
+
+    def _build_chunk_prompt(
+        self,
+        texts: List[str],
+        current_timestamp: str
+    ) -> list:
+        """
+        Format the multi-document prompt for one chunk of email texts
+
+        Args:
+            texts: Email texts in the chunk (<= BATCH_SIZE)
+            current_timestamp: Timestamp shared by the whole batch
+
+        Returns:
+            Formatted message list for the chunk
+        """
+        numbered = "\n\n".join(f"{i + 1}. {text}" for i, text in enumerate(texts))
+
+        return self.batch_prompt.format_messages(
+            transaction_messages=numbered,
+            current_timestamp=current_timestamp,
+        )
+
+    def _collect_chunk(
+        self,
+        emails: List[Dict[str, Any]],
+        batch: TransactionBatch
+    ) -> List[Dict[str, Any]]:
+        """
+        Validate one chunk's structured response and attach email metadata
+
+        Args:
+            emails: Chunk of email dictionaries (<= BATCH_SIZE)
+            batch: Structured TransactionBatch response for the chunk
+
+        Returns:
+            List of parsed transaction data
+
+        Raises:
+            ValueError: If the response has the wrong entry count
+        """
+        if len(batch.transactions) != len(emails):
+            raise ValueError(
+                f"Batch returned {len(batch.transactions)} entries "
+                f"for {len(emails)} messages"
+            )
+
+        results = []
+        for email, parsed_data in zip(emails, batch.transactions):
+            parsed = parsed_data.model_dump()
+            parsed['email_id'] = email['id']
+            parsed['email_subject'] = email['subject']
+            parsed['email_date'] = email['date']
+            results.append(parsed)
+
+        return results
+
+    async def _aparse_emails_individually(
+        self,
+        emails: List[Dict[str, Any]],
+        texts: List[str],
+        current_timestamp: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-email fallback when a chunk response can't be used
+
+        Args:
+            emails: Chunk of email dictionaries
+            texts: Matching email texts
+            current_timestamp: Timestamp shared by the whole batch
+
+        Returns:
+            List of parsed transaction data
+        """
+        parsed_list = await asyncio.gather(
+            *(self.aparse_email(text, current_timestamp) for text in texts)
+        )
+
+        results = []
+        for email, parsed in zip(emails, parsed_list):
             if parsed:
-                # Add original email metadata
                 parsed['email_id'] = email['id']
                 parsed['email_subject'] = email['subject']
                 parsed['email_date'] = email['date']
                 results.append(parsed)
-        
-        logger.info(f"Parsed {len(results)}/{len(emails)} emails successfully")
+
         return results
 
 
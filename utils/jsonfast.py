@@ -0,0 +1,57 @@
+"""
+Fast JSON
+orjson-backed drop-in for googleapiclient's stdlib json usage
+"""
+
+import json as _stdlib_json
+
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json remains in place
+    orjson = None
+
+
+class _OrjsonShim:
+    """json-module-compatible facade backed by orjson"""
+
+    JSONDecodeError = _stdlib_json.JSONDecodeError
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        # orjson returns bytes; callers expect str
+        return orjson.dumps(obj).decode()
+
+    @staticmethod
+    def load(fp, **kwargs):
+        return orjson.loads(fp.read())
+
+    @staticmethod
+    def dump(obj, fp, **kwargs):
+        fp.write(orjson.dumps(obj).decode())
+
+
+def patch_googleapiclient() -> bool:
+    """
+    Swap googleapiclient's JSON codec for orjson
+
+    Decoding Gmail message payloads is dominated by JSON parsing;
+    orjson handles the same bytes several times faster than stdlib
+    json. No-op when orjson isn't installed.
+
+    Returns:
+        True if the patch was applied
+    """
+    if orjson is None:
+        logger.debug("orjson not installed; keeping stdlib json")
+        return False
+
+    import googleapiclient.model
+    googleapiclient.model.json = _OrjsonShim
+    logger.debug("googleapiclient JSON codec patched to orjson")
+    return True
@@ -0,0 +1,36 @@
+"""
+Shared Gemini Client Pool
+One ChatGoogleGenerativeAI client per temperature, shared across chains
+"""
+
+from functools import lru_cache
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+from loguru import logger
+
+from utils.env_loader import get_env_loader
+
+
+@lru_cache(maxsize=4)
+def get_llm(temperature: float) -> ChatGoogleGenerativeAI:
+    """
+    Get a shared Gemini client for the given temperature
+
+    Chains requesting the same temperature reuse one client (and its
+    underlying HTTP connections) instead of each constructing their own,
+    and nothing is built until the first chain actually needs it.
+
+    Args:
+        temperature: Sampling temperature for the model
+
+    Returns:
+        Shared ChatGoogleGenerativeAI instance
+    """
+    config = get_env_loader().get_config()
+
+    logger.debug(f"Creating Gemini client (temperature={temperature})")
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash",
+        google_api_key=config["google_api_key"],
+        temperature=temperature,
+    )
@@ -0,0 +1,93 @@
+"""
+Parsed Email Cache
+SQLite-backed cache of parsed transaction data keyed by Gmail message ID
+"""
+
+import json
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from loguru import logger
+
+DB_PATH = Path("cache/parsed_emails.db")
+
+
+class ParseCache:
+    """Persistent cache of parsed email results
+
+    Emails are immutable once parsed, so a successful result can be
+    reused forever; re-runs over the same mailbox skip the LLM for
+    every email already in here.
+    """
+
+    def __init__(self, db_path: Path = DB_PATH):
+        """
+        Open (or create) the cache database
+
+        Args:
+            db_path: Location of the SQLite file
+        """
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS parsed (email_id TEXT PRIMARY KEY, data TEXT)"
+        )
+        self._conn.commit()
+
+        logger.info(f"Parse cache ready at {db_path}")
+
+    def get_many(self, email_ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Look up cached results for a set of email IDs
+
+        Args:
+            email_ids: Gmail message IDs to check
+
+        Returns:
+            Mapping of email_id -> parsed transaction data for the hits
+        """
+        ids = list(email_ids)
+        if not ids:
+            return {}
+
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT email_id, data FROM parsed WHERE email_id IN ({placeholders})",
+                ids,
+            ).fetchall()
+
+        return {email_id: json.loads(data) for email_id, data in rows}
+
+    def put_many(self, results: List[Dict]) -> None:
+        """
+        Store parsed results in one transaction
+
+        Args:
+            results: Parsed transaction dicts carrying an email_id key
+        """
+        rows = [
+            (result['email_id'], json.dumps(result))
+            for result in results
+            if result.get('email_id')
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO parsed (email_id, data) VALUES (?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+
+@lru_cache(maxsize=1)
+def get_parse_cache() -> ParseCache:
+    """Get singleton instance of ParseCache"""
+    return ParseCache()
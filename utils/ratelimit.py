@@ -0,0 +1,131 @@
+"""
+Rate Limiter
+Token-bucket throttle and retry helper for outbound API calls
+"""
+
+import random
+import threading
+import time
+from typing import Any, Optional
+
+from googleapiclient.errors import HttpError
+from loguru import logger
+
+
+# Gmail's per-user quota is 250 quota units/second; tokens are quota
+# units (messages.get/list/modify cost 5 each), so callers acquire the
+# real cost of a call, not 1 per .execute(). Stay just under the cap.
+GMAIL_UNITS_PER_SEC = 240.0
+
+# Burst headroom for a full batch get (50 inner requests x 5 units);
+# must be >= the largest single acquire or it would block forever
+GMAIL_BURST_UNITS = 250.0
+
+# Statuses worth retrying with backoff (rate limit / transient unavailability)
+RETRYABLE_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+
+    def __init__(self, rate: float = GMAIL_UNITS_PER_SEC, capacity: Optional[float] = None):
+        """
+        Initialize token bucket
+
+        Args:
+            rate: Tokens refilled per second (sustained request rate)
+            capacity: Maximum burst size (defaults to rate)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Block until the requested tokens are available
+
+        Args:
+            tokens: Number of tokens to consume
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                wait = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def execute_with_retry(
+    request: Any,
+    limiter: Optional[TokenBucket] = None,
+    max_attempts: int = 3,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    http: Optional[Any] = None,
+    cost: float = 1.0
+) -> Any:
+    """
+    Execute a googleapiclient request through the limiter
+
+    Retries 429/503 responses with exponential backoff + jitter;
+    all other errors propagate immediately.
+
+    Args:
+        request: Prepared API request (anything with .execute())
+        limiter: Optional token bucket to throttle against
+        max_attempts: Maximum number of attempts
+        base_delay: Initial backoff delay in seconds
+        max_delay: Backoff delay ceiling in seconds
+        http: Optional transport to execute on (e.g. a pooled
+            per-thread AuthorizedHttp)
+        cost: Tokens this request consumes (a batch execute costs the
+            sum of its inner requests, not 1)
+
+    Returns:
+        The request's response
+    """
+    for attempt in range(1, max_attempts + 1):
+        if limiter:
+            limiter.acquire(cost)
+
+        try:
+            return request.execute(http=http) if http is not None else request.execute()
+        except HttpError as error:
+            status = getattr(error.resp, 'status', None)
+            if status not in RETRYABLE_STATUSES or attempt == max_attempts:
+                raise
+
+            delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+            delay += random.uniform(0, delay)  # jitter to avoid thundering herd
+            logger.warning(
+                f"API returned {status}; retrying in {delay:.1f}s "
+                f"(attempt {attempt}/{max_attempts})"
+            )
+            time.sleep(delay)
+
+
+# Singleton instance
+_gmail_limiter: Optional[TokenBucket] = None
+
+
+def get_gmail_limiter() -> TokenBucket:
+    """Get singleton token bucket for Gmail API calls"""
+    global _gmail_limiter
+    if _gmail_limiter is None:
+        _gmail_limiter = TokenBucket(
+            rate=GMAIL_UNITS_PER_SEC,
+            capacity=GMAIL_BURST_UNITS
+        )
+    return _gmail_limiter